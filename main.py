@@ -1,19 +1,38 @@
 import asyncio
+import hashlib
 import os
 import re
 import logging
 import time
+import diskcache
+from functools import partial
+from string import Template
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
 from g4f.client import Client
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi.middleware.cors import CORSMiddleware
 
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    model_executor.shutdown(wait=False, cancel_futures=True)
+    disk_cache.close()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,55 +64,245 @@ top_models = [
     "grok-3-r1",
 ]
 
-async def request_ai(prompt: str) -> Dict[str, Any]:
-    for model in top_models:
-        logger.info(f"Trying model '{model}'...")
-        start_time = time.time()
-        try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    lambda: client.chat.completions.create(
-                        model=model,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0,
-                        web_search=False,
-                        stream=False
-                    )
-                ),
-                timeout=90
-            )
-            elapsed = time.time() - start_time
-            content = response.choices[0].message.content.strip()
-            logger.info(f"Model '{model}' returned a response successfully in {elapsed:.2f} seconds.")
-            return {"model": model, "content": content, "time": elapsed}
-
-        except asyncio.TimeoutError:
-            elapsed = time.time() - start_time
-            logger.warning(f"Model '{model}' timed out after {elapsed:.2f} seconds.")
-            continue
+MODEL_PROBE_CONCURRENCY = max(1, int(os.environ.get("MODEL_PROBE_CONCURRENCY", 3)))
+MODEL_CONCURRENT_QUERIES = max(1, int(os.environ.get("MODEL_CONCURRENT_QUERIES", 8)))
+MODEL_EXECUTOR_WORKERS = int(
+    os.environ.get("MODEL_EXECUTOR_WORKERS", MODEL_PROBE_CONCURRENCY * MODEL_CONCURRENT_QUERIES)
+)
 
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Model '{model}' failed after {elapsed:.2f} seconds with error: {e}")
-            continue
+model_executor = ThreadPoolExecutor(
+    max_workers=MODEL_EXECUTOR_WORKERS,
+    thread_name_prefix="g4f"
+)
+
+# Cancelling a probe does not stop its g4f call, so a slot is held until the
+# worker thread actually finishes, not until the awaiting task gives up.
+model_executor_slots = asyncio.Semaphore(MODEL_EXECUTOR_WORKERS)
+
+def release_executor_slot(loop: asyncio.AbstractEventLoop, _future: Any) -> None:
+    try:
+        loop.call_soon_threadsafe(model_executor_slots.release)
+    except RuntimeError:
+        pass
+
+MODEL_LATENCY_EWMA_ALPHA = 0.3
+MODEL_MIN_TIMEOUT = 10.0
+MODEL_MAX_TIMEOUT = 90.0
+MODEL_DEFAULT_TIMEOUT = 20.0
+
+# Latency differs a lot between a short verify explanation and a 25-question
+# generation, so stats are tracked per (model, prompt kind).
+_model_stats: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+    lambda: {"ok": 0, "fail": 0, "ewma": 30.0}
+)
+
+def record_model_success(model: str, kind: str, elapsed: float) -> None:
+    stats = _model_stats[model, kind]
+    if stats["ok"]:
+        stats["ewma"] += MODEL_LATENCY_EWMA_ALPHA * (elapsed - stats["ewma"])
+    else:
+        stats["ewma"] = elapsed
+    stats["ok"] += 1
+
+def record_model_failure(model: str, kind: str) -> None:
+    _model_stats[model, kind]["fail"] += 1
+
+def model_timeout(model: str, kind: str, attempt: int) -> float:
+    stats = _model_stats[model, kind]
+    base = stats["ewma"] * 3 if stats["ok"] else MODEL_DEFAULT_TIMEOUT
+    return min(MODEL_MAX_TIMEOUT, max(MODEL_MIN_TIMEOUT, base * 2 ** attempt))
+
+def model_priority(model: str, kind: str) -> Tuple[float, float]:
+    stats = _model_stats[model, kind]
+    failure_rate = stats["fail"] / (stats["ok"] + stats["fail"] + 1)
+    return failure_rate, stats["ewma"]
+
+PROMPT_CACHE_TTL = float(os.environ.get("PROMPT_CACHE_TTL", 300))
+PROMPT_CACHE_MAX_SIZE = int(os.environ.get("PROMPT_CACHE_MAX_SIZE", 256))
+PROMPT_CACHE_DIR = os.environ.get("PROMPT_CACHE_DIR", "/tmp/llm_cache")
+
+disk_cache = diskcache.Cache(PROMPT_CACHE_DIR, size_limit=100_000_000)
+
+_prompt_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+def prompt_cache_key(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+def verify_cache_key(endpoint: str, *fields: Any) -> str:
+    return prompt_cache_key(repr((endpoint, *fields)))
+
+def normalize_answer(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def get_cached_response(key: str) -> Optional[Dict[str, Any]]:
+    entry = _prompt_cache.get(key)
+    if entry is None:
+        return None
+
+    stored_at, result = entry
+    if time.time() - stored_at >= PROMPT_CACHE_TTL:
+        del _prompt_cache[key]
+        return None
+
+    _prompt_cache.move_to_end(key)
+    return result
+
+def store_cached_response(key: str, result: Dict[str, Any], stored_at: Optional[float] = None) -> None:
+    _prompt_cache[key] = (stored_at or time.time(), result)
+    _prompt_cache.move_to_end(key)
+    while len(_prompt_cache) > PROMPT_CACHE_MAX_SIZE:
+        _prompt_cache.popitem(last=False)
+
+def finish_inflight(key: str, task: "asyncio.Task[Dict[str, Any]]") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+
+async def read_disk_cache(key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+    try:
+        return await asyncio.to_thread(disk_cache.get, key)
+    except Exception as e:
+        logger.warning(f"Disk cache read failed, treating as a miss: {e}")
+        return None
+
+async def write_disk_cache(key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+    try:
+        await asyncio.to_thread(
+            partial(disk_cache.set, key, entry, expire=PROMPT_CACHE_TTL)
+        )
+    except Exception as e:
+        logger.warning(f"Disk cache write failed, skipping: {e}")
+
+async def fetch_response(key: str, prompt: str, kind: str) -> Dict[str, Any]:
+    entry = await read_disk_cache(key)
+    if entry is not None:
+        logger.info("Returning response from disk cache.")
+        stored_at, result = entry
+        store_cached_response(key, result, stored_at)
+        return result
+
+    result = await query_models(prompt, kind)
+    if result["model"] is not None:
+        stored_at = time.time()
+        store_cached_response(key, result, stored_at)
+        await write_disk_cache(key, (stored_at, result))
+    return result
+
+async def request_ai(prompt: str, cache_key: Optional[str] = None, kind: str = "default") -> Dict[str, Any]:
+    key = cache_key or prompt_cache_key(prompt)
+    cached = get_cached_response(key)
+    if cached is not None:
+        logger.info("Returning cached response.")
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(fetch_response(key, prompt, kind))
+        task.add_done_callback(lambda t: finish_inflight(key, t))
+        _inflight[key] = task
+    else:
+        logger.info("Joining in-flight request for the same prompt.")
+
+    return await asyncio.shield(task)
+
+async def call_model(model: str, kind: str, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+    call = partial(
+        client.chat.completions.create,
+        model=model,
+        messages=messages,
+        temperature=0,
+        web_search=False,
+        stream=False
+    )
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    if model_executor_slots.locked():
+        logger.warning(f"Model executor is full; model '{model}' is waiting for a free worker.")
+    try:
+        await asyncio.wait_for(model_executor_slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"No free model worker for '{model}' within {timeout:.2f} seconds; "
+            f"not counted as a model failure."
+        )
+        raise
+
+    start_time = time.time()
+    try:
+        future = model_executor.submit(call)
+    except Exception:
+        model_executor_slots.release()
+        raise
+    future.add_done_callback(partial(release_executor_slot, loop))
+
+    logger.info(f"Trying model '{model}'...")
+    try:
+        response = await asyncio.wait_for(
+            asyncio.wrap_future(future),
+            timeout=max(0.0, deadline - loop.time())
+        )
+        elapsed = time.time() - start_time
+        content = response.choices[0].message.content.strip()
+
+    except asyncio.TimeoutError:
+        elapsed = time.time() - start_time
+        logger.warning(f"Model '{model}' timed out after {elapsed:.2f} seconds.")
+        record_model_failure(model, kind)
+        raise
+
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Model '{model}' failed after {elapsed:.2f} seconds with error: {e}")
+        record_model_failure(model, kind)
+        raise
+
+    record_model_success(model, kind, elapsed)
+    logger.info(f"Model '{model}' returned a response successfully in {elapsed:.2f} seconds.")
+    return {"model": model, "content": content, "time": elapsed}
+
+async def query_models(prompt: str, kind: str) -> Dict[str, Any]:
+    messages = static_prompt_messages.get(prompt) or [{"role": "user", "content": prompt}]
+    models = sorted(top_models, key=lambda model: model_priority(model, kind))
+    for attempt, i in enumerate(range(0, len(models), MODEL_PROBE_CONCURRENCY)):
+        wave = [
+            asyncio.create_task(call_model(model, kind, messages, model_timeout(model, kind, attempt)))
+            for model in models[i:i + MODEL_PROBE_CONCURRENCY]
+        ]
+        try:
+            for next_done in asyncio.as_completed(wave):
+                try:
+                    return await next_done
+                except Exception:
+                    continue
+        finally:
+            for task in wave:
+                task.cancel()
 
     logger.warning("No model returned a valid response.")
     return {"model": None, "content": "Brak odpowiedzi od żadnego modelu.", "time": None}
 
+_QUESTIONS_RE = re.compile(
+    r"Start:\s*(.*?)\s*End:\s*OptionsStart:\s*(.*?)\s*(\d)\s*OptionsEnd:",
+    re.DOTALL
+)
+
+_TF_RE = re.compile(
+    r"Start:\s*(.*?)\s*End:\s*answerStart:\s*(1|0)\s*answerEnd:",
+    re.DOTALL
+)
+
+_OPEN_RE = re.compile(r"Start:\s*((?:(?!Start:).)*?)\s*(?:End:|(?=Start:)|\Z)", re.DOTALL)
+
 def parse_questions(text: str) -> List[Dict[str, Any]]:
-    pattern = re.compile(
-        r"Start:\s*(.*?)\s*End:\s*OptionsStart:\s*(.*?)\s*(\d)\s*OptionsEnd:",
-        re.DOTALL
-    )
     questions = []
-    matches = pattern.findall(text)
 
-    for match in matches:
-        question_text = match[0].strip()
-        options_text = match[1].strip()
-        correct_index = int(match[2])
+    for match in _QUESTIONS_RE.finditer(text):
+        question_text = match.group(1).strip()
+        options_text = match.group(2).strip()
+        correct_index = int(match.group(3))
 
-        options = [opt.strip() for opt in options_text.splitlines() if opt.strip()]
+        options = [opt for line in options_text.splitlines() if (opt := line.strip())]
 
         if len(options) != 4:
             continue
@@ -183,28 +392,81 @@ Instrukcje:
 3. Pytania muszą być realistyczne i losowo dobrane z podanych tematów.
 """
 
+prompt_all = """
+Stwórz zestaw pytań z geografii dla szkoły średniej, temat: "Rolnictwo, leśnictwo, rybactwo".  
+Każde pytanie powinno losowo pochodzić z jednej z poniższych podtematów:
+1. Czynniki rozwoju rolnictwa
+2. Główne obszary upraw
+3. Chów zwierząt
+4. Lasy na Ziemi. Gospodarka leśna
+5. Rybactwo
+
+Odpowiedź musi składać się z dokładnie trzech sekcji, w tej kolejności, każda rozpoczęta własnym znacznikiem:
+
+===ABCD===
+10 pytań jednokrotnego wyboru, każde dokładnie w formacie:
+
+Start:
+[Tutaj wstaw pytanie]
+End:
+OptionsStart:
+Option1
+Option2
+Option3
+Option4
+correctOptionIndex
+OptionsEnd:
+
+===TF===
+10 pytań typu Prawda/Fałsz, każde dokładnie w formacie:
+
+Start:
+[Tutaj pytanie Prawda/Fałsz]
+End:
+answerStart:
+1
+answerEnd:
+
+===OPEN===
+5 pytań otwartych (bez odpowiedzi), każde dokładnie w formacie:
+
+Start:
+[Tutaj pytanie]
+End:
+
+Instrukcje:
+1. Znaczniki ===ABCD===, ===TF=== i ===OPEN=== muszą pojawić się dokładnie raz, każdy w osobnej linii.  
+2. Każde pytanie jednokrotnego wyboru musi mieć dokładnie 4 realistyczne, unikalne i sensowne odpowiedzi; correctOptionIndex to numer poprawnej odpowiedzi od 0 do 3.  
+3. Odpowiedzi Prawda/Fałsz oznacz jako 1 (prawda) lub 0 (fałsz).  
+4. Nie dodawaj żadnych komentarzy ani wprowadzeń – tylko znaczniki sekcji i pytania w dokładnym formacie.  
+5. Pytania muszą być powiązane z tematami podanymi powyżej, losowo wybierając temat dla każdego pytania.
+"""
+
+prompt_question_key = prompt_cache_key(prompt_question)
+prompt_true_false_binary_key = prompt_cache_key(prompt_true_false_binary)
+prompt_open_key = prompt_cache_key(prompt_open)
+prompt_all_key = prompt_cache_key(prompt_all)
+
+static_prompt_messages = {
+    prompt: [{"role": "user", "content": prompt}]
+    for prompt in (prompt_question, prompt_true_false_binary, prompt_open, prompt_all)
+}
+
+_SECTION_RE = re.compile(r"===\s*(ABCD|TF|OPEN)\s*===")
+
+def split_sections(raw_text: str) -> Dict[str, str]:
+    parts = _SECTION_RE.split(raw_text)
+    return dict(zip(parts[1::2], parts[2::2]))
+
 def parse_open_questions(raw_text: str):
-    questions = []
-    parts = raw_text.split("Start:")
-    for part in parts[1:]:
-        try:
-            question_text = part.split("End:")[0].strip()
-            questions.append(question_text)
-        except IndexError:
-            continue
-    return questions
+    return [match.group(1).strip() for match in _OPEN_RE.finditer(raw_text)]
 
 def parse_true_false_binary(raw_text: str):
     questions = []
-    pattern = re.compile(
-        r"Start:\s*(.*?)\s*End:\s*answerStart:\s*(1|0)\s*answerEnd:",
-        re.DOTALL
-    )
-    matches = pattern.findall(raw_text)
 
-    for match in matches:
-        question_text = match[0].strip()
-        answer_value = int(match[1])
+    for match in _TF_RE.finditer(raw_text):
+        question_text = match.group(1).strip()
+        answer_value = int(match.group(2))
         questions.append({
             "question": question_text,
             "answer": answer_value
@@ -214,9 +476,9 @@ def parse_true_false_binary(raw_text: str):
 
 @app.get("/chatABCD")
 async def chat():
-    result = await request_ai(prompt_question)
+    result = await request_ai(prompt_question, prompt_question_key, "chatABCD")
     questions = parse_questions(result["content"])
-    return JSONResponse({
+    return ORJSONResponse({
         "model": result["model"],
         "questions": questions
     })
@@ -224,103 +486,156 @@ async def chat():
 
 @app.get("/chatTRUEFALSE")
 async def chat_true_false():
-    result = await request_ai(prompt_true_false_binary)
+    result = await request_ai(prompt_true_false_binary, prompt_true_false_binary_key, "chatTRUEFALSE")
     questions = parse_true_false_binary(result["content"])
-    return JSONResponse({
+    return ORJSONResponse({
         "model": result["model"],
         "questions": questions
     })
 
 @app.get("/chatOPEN")
 async def chat_open():
-    result = await request_ai(prompt_open)
+    result = await request_ai(prompt_open, prompt_open_key, "chatOPEN")
     questions = parse_open_questions(result["content"])
-    return JSONResponse({
+    return ORJSONResponse({
         "model": result["model"],
         "questions": questions
     })
 
+@app.get("/chatALL")
+async def chat_all():
+    result = await request_ai(prompt_all, prompt_all_key, "chatALL")
+    sections = split_sections(result["content"])
+    return ORJSONResponse({
+        "model": result["model"],
+        "abcd": parse_questions(sections.get("ABCD", "")),
+        "tf": parse_true_false_binary(sections.get("TF", "")),
+        "open": parse_open_questions(sections.get("OPEN", ""))
+    })
+
+prompt_verify_abcd = Template("""
+Masz już gotowe dane pytania z geografii dla szkoły średniej:
+
+question: "$question"
+options: $options
+correctOptionIndex: $correctOptionIndex
+userOptionIndex: $userOptionIndex
+
+Twoim zadaniem jest wygenerować **tylko wyjaśnienie**, dlaczego wybrany wariant (userOptionIndex) jest niepoprawny, jeśli taki był, i dlaczego poprawna odpowiedź jest właśnie ta (correctOptionIndex).  
+Nie dodawaj pytania ani żadnych innych danych.  
+Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
+""")
+
+prompt_verify_true_false = Template("""
+Masz już gotowe dane pytania Prawda/Fałsz z geografii dla szkoły średniej:
+
+question: "$question"
+answer: $answer
+optionAnswer: $optionAnswer
+
+Twoim zadaniem jest wygenerować **tylko wyjaśnienie**, dlaczego wybrany wariant (optionAnswer) jest niepoprawny, jeśli taki był, i dlaczego poprawna odpowiedź jest właśnie taka (answer).  
+Nie dodawaj pytania ani żadnych innych danych.  
+Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
+""")
+
+prompt_verify_open = Template("""
+Masz gotowe pytanie otwarte z geografii dla szkoły średniej:
+
+question: "$question"
+userAnswer: "$userAnswer"
+
+Twoim zadaniem jest wygenerować **tylko wyjaśnienie lub komentarz edukacyjny** dotyczący tego pytania i odpowiedzi ucznia.  
+Wyjaśnij, co było poprawne lub błędne w userAnswer, i podaj poprawny kierunek lub wskazówkę.  
+Nie dodawaj pytania ani żadnych innych danych.  
+Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
+""")
+
 class VerifyRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     question: str
     options: List[str]
     correctOptionIndex: int
     userOptionIndex: int
 
 class VerifyTFRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     question: str
     answer: int
     optionAnswer: int
 
 @app.post("/verify_ABCD")
 async def verify_ABCD(request: VerifyRequest):
-    prompt_explanation = f"""
-Masz już gotowe dane pytania z geografii dla szkoły średniej:
-
-question: "{request.question}"
-options: {request.options}
-correctOptionIndex: {request.correctOptionIndex}
-userOptionIndex: {request.userOptionIndex}
-
-Twoim zadaniem jest wygenerować **tylko wyjaśnienie**, dlaczego wybrany wariant (userOptionIndex) jest niepoprawny, jeśli taki był, i dlaczego poprawna odpowiedź jest właśnie ta (correctOptionIndex).  
-Nie dodawaj pytania ani żadnych innych danych.  
-Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
-"""
-
-    explanation_text = await request_ai(prompt_explanation)
-    return JSONResponse({"verify": explanation_text})
+    prompt_explanation = prompt_verify_abcd.substitute(
+        question=request.question,
+        options=request.options,
+        correctOptionIndex=request.correctOptionIndex,
+        userOptionIndex=request.userOptionIndex
+    )
 
-class VerifyOpenRequest(BaseModel):
-    question: str
-    userAnswer: str
+    cache_key = verify_cache_key(
+        "verify_ABCD",
+        request.question,
+        tuple(request.options),
+        request.correctOptionIndex,
+        request.userOptionIndex
+    )
+    explanation_text = await request_ai(prompt_explanation, cache_key, "verify_ABCD")
+    return ORJSONResponse({"verify": explanation_text})
 
 @app.post("/verify_TRUEFALSE")
 async def verify_TRUEFALSE(request: VerifyTFRequest):
-    prompt_explanation = f"""
-Masz już gotowe dane pytania Prawda/Fałsz z geografii dla szkoły średniej:
-
-question: "{request.question}"
-answer: {request.answer}
-optionAnswer: {request.optionAnswer}
-
-Twoim zadaniem jest wygenerować **tylko wyjaśnienie**, dlaczego wybrany wariant (optionAnswer) jest niepoprawny, jeśli taki był, i dlaczego poprawna odpowiedź jest właśnie taka (answer).  
-Nie dodawaj pytania ani żadnych innych danych.  
-Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
-"""
+    prompt_explanation = prompt_verify_true_false.substitute(
+        question=request.question,
+        answer=request.answer,
+        optionAnswer=request.optionAnswer
+    )
 
-    explanation_text = await request_ai(prompt_explanation)
-    return JSONResponse({"verify": explanation_text})
+    cache_key = verify_cache_key(
+        "verify_TRUEFALSE",
+        request.question,
+        request.answer,
+        request.optionAnswer
+    )
+    explanation_text = await request_ai(prompt_explanation, cache_key, "verify_TRUEFALSE")
+    return ORJSONResponse({"verify": explanation_text})
 
 
 class VerifyOpenRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     question: str
     userAnswer: str
 
 
 @app.post("/verify_OPEN")
 async def verify_OPEN(request: VerifyOpenRequest):
-    prompt_explanation = f"""
-Masz gotowe pytanie otwarte z geografii dla szkoły średniej:
-
-question: "{request.question}"
-userAnswer: "{request.userAnswer}"
-
-Twoim zadaniem jest wygenerować **tylko wyjaśnienie lub komentarz edukacyjny** dotyczący tego pytania i odpowiedzi ucznia.  
-Wyjaśnij, co było poprawne lub błędne w userAnswer, i podaj poprawny kierunek lub wskazówkę.  
-Nie dodawaj pytania ani żadnych innych danych.  
-Nie używaj Start: ani End:, po prostu zwróć czysty tekst wyjaśnienia.
-"""
+    prompt_explanation = prompt_verify_open.substitute(
+        question=request.question,
+        userAnswer=request.userAnswer
+    )
 
-    explanation_text = await request_ai(prompt_explanation)
-    return JSONResponse({"verify": explanation_text})
+    cache_key = verify_cache_key(
+        "verify_OPEN",
+        request.question,
+        normalize_answer(request.userAnswer)
+    )
+    explanation_text = await request_ai(prompt_explanation, cache_key, "verify_OPEN")
+    return ORJSONResponse({"verify": explanation_text})
 
 if __name__ == "__main__":
     import uvicorn
 
+    dev_mode = os.environ.get("ENV") == "dev"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=int(os.environ.get("PORT", 8080)),
-        reload=True,
+        port=int(os.getenv("PORT", "8080")),
+        reload=dev_mode,
+        workers=None if dev_mode else int(os.environ.get("WEB_CONCURRENCY", 4)),
+        loop="auto",
+        http="httptools",
         timeout_keep_alive=900,
         timeout_graceful_shutdown=900
     )
\ No newline at end of file